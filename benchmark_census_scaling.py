@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+Corpus-scale benchmark for simplify-census-data.py and update_relationships.py.
+
+Generates synthetic census exports (households with spouses, children and the
+occasional grandparent or boarder, split into ~40-person images), runs both
+tools end to end on each corpus size, and reports runtime and peak memory
+together with fitted complexity (t ~ n^k) for each tool and each stage.
+
+Usage:
+    python benchmark_census_scaling.py [--sizes 1000 10000 100000 1000000]
+                                       [--timeout 900] [--report report.json]
+
+Sizes are numbers of people. Once a tool times out, larger sizes are skipped
+for that tool. Peak memory is the child process's max RSS.
+
+Stage timings come from a second run that times each stage of the streaming
+pipeline per call (per document, partition or record) and adds the times up.
+Stage memory comes from a third, tracemalloc-traced run: the peak traced
+Python memory while each stage was running. Both are skipped with --no-stages.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SIMPLIFY_SCRIPT = os.path.join(ROOT, 'simplify-census-data.py')
+UPDATE_SCRIPT = os.path.join(ROOT, 'update_relationships.py')
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+PEOPLE_PER_IMAGE = 40
+
+GIVEN_NAMES = {
+    'M': ['John', 'George', 'Joseph', 'Isaic', 'Absolom', 'Marion', 'Charles', 'Thompson', 'William', 'James'],
+    'F': ['Reamy', 'Julia', 'Mollie', 'Maggie', 'Kitty', 'Luella', 'Ida', 'Mary', 'Sarah', 'Emmorin'],
+}
+SURNAMES = ['Ockerman', 'Guthrea', 'Hamilton', 'Mitchell', 'Collins', 'Fisher', 'Hughes', 'Parker', 'Rogers', 'Wells']
+COUNTIES = ['Nicholas County', 'Bourbon County', 'Fleming County', 'Mason County', 'Bath County']
+RACES = ['White', 'Black', 'Mulatto']
+
+# (FIRST role, SECOND role) written to the update_relationships spec
+SPEC_ROLES = {
+    'COUPLE': ('SPOUSE', 'SPOUSE'),
+    'PARENT_CHILD': ('PARENT', 'CHILD'),
+    'SIBLING': ('SIBLING', 'SIBLING'),
+    'GRAND_PARENT': ('GRANDPARENT', 'GRANDCHILD'),
+    'PARENT_CHILD_IN_LAW': ('PARENT_IN_LAW', 'CHILD_IN_LAW'),
+}
+
+# ----------------------------------------------------------------------------
+# Synthetic corpus
+# ----------------------------------------------------------------------------
+
+def generate_household(rng, new_id):
+    """
+    Generate one household.
+
+    Returns:
+        (people, relationships) where people are dicts with id/given/surname/age/sex
+        and relationships are (relType, (id, order), (id, order)) tuples
+    """
+    surname = rng.choice(SURNAMES)
+    people = []
+    relationships = []
+
+    def person(sex, age, surname=surname):
+        p = {'id': new_id('1:1'), 'given': rng.choice(GIVEN_NAMES[sex]), 'surname': surname,
+             'age': str(age), 'sex': sex}
+        people.append(p)
+        return p
+
+    def relate(rel_type, first, second):
+        relationships.append((rel_type, (first['id'], 'FIRST'), (second['id'], 'SECOND')))
+
+    head_sex = 'M' if rng.random() < 0.85 else 'F'
+    head = person(head_sex, rng.randint(22, 70))
+    parents = [head]
+
+    if rng.random() < 0.75:
+        spouse = person('F' if head_sex == 'M' else 'M', max(18, int(head['age']) + rng.randint(-8, 4)))
+        relate('COUPLE', head, spouse)
+        parents.append(spouse)
+
+    children = []
+    for _ in range(rng.choices(range(8), weights=[18, 14, 16, 15, 12, 10, 8, 7])[0]):
+        child = person(rng.choice('MF'), rng.randint(0, max(0, int(head['age']) - 18)))
+        for parent in parents:
+            relate('PARENT_CHILD', parent, child)
+        children.append(child)
+
+    for i, first in enumerate(children):
+        for second in children[i + 1:]:
+            relate('SIBLING', first, second)
+
+    if rng.random() < 0.1:
+        grandparent = person(rng.choice('MF'), int(head['age']) + rng.randint(20, 30))
+        relate('PARENT_CHILD', grandparent, head)
+        for parent in parents[1:]:
+            relate('PARENT_CHILD_IN_LAW', grandparent, parent)
+        for child in children:
+            relate('GRAND_PARENT', grandparent, child)
+
+    if rng.random() < 0.05:
+        person(rng.choice('MF'), rng.randint(15, 60), surname=rng.choice(SURNAMES))
+
+    return people, relationships
+
+def household_elements(rng, people, relationships, partition_key, new_id, year, county):
+    """Complex export elements for one household (RECORD, PERSONs, FIELDs, RELATIONSHIPs)"""
+    elements = []
+
+    def element(elem_type, **fields):
+        elem = {'partitionKey': partition_key, 'id': fields.pop('id', None) or new_id(), 'elementType': elem_type}
+        elem.update(fields)
+        elements.append(elem)
+        return elem
+
+    def field(field_type, text):
+        return element('FIELD', fieldType=field_type, fieldValues=[{'origValue': {'text': text}}])
+
+    def refs(*elems):
+        return [{'partitionKey': partition_key, 'id': e['id']} for e in elems]
+
+    element('RECORD', id=new_id('1:2'), recordType='CENSUS',
+            subElements=[{'partitionKey': partition_key, 'id': p['id']} for p in people])
+
+    # Relationships hang off the FIRST person, as in the real exports
+    owned = {}
+    for rel_type, (first_id, first_order), (second_id, second_order) in relationships:
+        rel = element('RELATIONSHIP', relType=rel_type, superElements=[
+            {'partitionKey': partition_key, 'id': first_id, 'order': first_order},
+            {'partitionKey': partition_key, 'id': second_id, 'order': second_order},
+        ])
+        owned.setdefault(first_id, []).append(rel)
+
+    for p in people:
+        name = element('NAME', subElements=refs(field('NAME_GN', p['given']), field('NAME_SURN', p['surname'])))
+        event = element('EVENT', subElements=refs(field('DATE', year), field('PLACE', 'Ky'), field('PLACE', county)))
+        subs = [name, field('AGE', p['age']), field('SEX', p['sex']), field('RACE', rng.choice(RACES)), event]
+        element('PERSON', id=p['id'], subElements=refs(*subs, *owned.get(p['id'], [])))
+
+    return elements
+
+def write_corpus(n_people, directory, seed=0):
+    """
+    Write a synthetic corpus of about `n_people` people.
+
+    Creates export.json (concatenated per-image export documents) and spec.json
+    (people and relationship definitions for update_relationships.py).
+
+    Returns:
+        Dict of corpus statistics and file paths
+    """
+    rng = random.Random(seed)
+    counter = iter(range(1, 1 << 62))
+
+    def new_id(prefix=None):
+        n = next(counter)
+        return f"{prefix}:SYN-{n:08X}" if prefix else f"syn-{n:012x}"
+
+    export_path = os.path.join(directory, 'export.json')
+    spec_path = os.path.join(directory, 'spec.json')
+    people_part = os.path.join(directory, 'spec-people.part')
+    rels_part = os.path.join(directory, 'spec-relationships.part')
+
+    stats = {'people': 0, 'records': 0, 'relationships': 0, 'elements': 0, 'images': 0}
+
+    with open(export_path, 'w', encoding='utf-8') as export, \
+            open(people_part, 'w', encoding='utf-8') as people_out, \
+            open(rels_part, 'w', encoding='utf-8') as rels_out:
+
+        def flush_image(elements):
+            export.write(json.dumps({'elements': elements}, separators=(',', ':')))
+            export.write('\n')
+            stats['images'] += 1
+            stats['elements'] += len(elements)
+
+        image_elements = []
+        image_people = 0
+        partition_key = f"3:1:SYN-IMG-{stats['images']:06d}"
+        year = str(rng.choice(range(1850, 1951, 10)))
+        county = rng.choice(COUNTIES)
+
+        while stats['people'] < n_people:
+            people, relationships = generate_household(rng, new_id)
+            image_elements.extend(household_elements(
+                rng, people, relationships, partition_key, new_id, year, county))
+
+            keys = {p['id']: f"{p['given']} {p['surname']} ({p['id']})" for p in people}
+            definitions = {key: [] for key in keys.values()}
+            for rel_type, (first_id, _), (second_id, _) in relationships:
+                first_role, second_role = SPEC_ROLES[rel_type]
+                definitions[keys[first_id]].append([rel_type, first_role, keys[second_id]])
+                definitions[keys[second_id]].append([rel_type, second_role, keys[first_id]])
+
+            for person_id, key in keys.items():
+                people_out.write(f",{json.dumps(key)}:{json.dumps(person_id)}")
+                rels_out.write(f",{json.dumps(key)}:{json.dumps(definitions[key], separators=(',', ':'))}")
+
+            stats['people'] += len(people)
+            stats['records'] += 1
+            stats['relationships'] += len(relationships)
+            image_people += len(people)
+
+            if image_people >= PEOPLE_PER_IMAGE:
+                flush_image(image_elements)
+                image_elements = []
+                image_people = 0
+                partition_key = f"3:1:SYN-IMG-{stats['images']:06d}"
+                year = str(rng.choice(range(1850, 1951, 10)))
+                county = rng.choice(COUNTIES)
+
+        if image_elements:
+            flush_image(image_elements)
+
+    with open(spec_path, 'w', encoding='utf-8') as spec:
+        for name, part in (('people', people_part), ('relationships', rels_part)):
+            spec.write('{' if name == 'people' else ',')
+            spec.write(f'"{name}":{{')
+            with open(part, 'r', encoding='utf-8') as f:
+                f.read(1)  # Leading comma
+                shutil.copyfileobj(f, spec)
+            spec.write('}')
+        spec.write('}')
+    os.remove(people_part)
+    os.remove(rels_part)
+
+    stats['exportBytes'] = os.path.getsize(export_path)
+    stats['export'] = export_path
+    stats['spec'] = spec_path
+    return stats
+
+# ----------------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------------
+
+def run_child(cmd, timeout):
+    """
+    Run a command and measure it.
+
+    Returns:
+        Dict with seconds, peakRssBytes, returncode and timedOut
+    """
+    # stderr goes to a file, not a pipe: nothing reads a pipe until the child
+    # exits, so a chatty child would block on a full pipe and look like a timeout
+    with tempfile.TemporaryFile() as stderr_file:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=stderr_file, cwd=ROOT)
+        delay = 0.001
+        timed_out = False
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() - started > timeout:
+                proc.kill()
+                pid, status, usage = os.wait4(proc.pid, 0)
+                timed_out = True
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        seconds = time.perf_counter() - started
+
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        stderr_file.seek(max(0, stderr_file.seek(0, os.SEEK_END) - 2000))
+        stderr = stderr_file.read().decode('utf-8', 'replace')
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return {
+        'seconds': round(seconds, 4),
+        'peakRssBytes': peak_rss,
+        'returncode': proc.returncode,
+        'timedOut': timed_out,
+        'stderr': stderr if proc.returncode and not timed_out else '',
+    }
+
+def load_script(name, path):
+    """Import a script by path (simplify-census-data.py is not an importable name)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class StageClock:
+    """
+    Accumulate time (and optionally peak traced memory) per pipeline stage.
+
+    Stages nest when one pulls from another (transform pulls partitions, which
+    pull documents); a stage's time excludes the time spent in the stages it
+    pulled from. Its memory is the peak traced memory while it was the
+    innermost running stage, so memory still held for other stages (e.g. the
+    document being partitioned) counts as well.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = defaultdict(float)
+        self.peak_bytes = defaultdict(int)
+        self._stack = []
+
+    def _close_segment(self, name):
+        # Attribute the traced peak since the last stage switch to `name`
+        if self.trace_memory:
+            self.peak_bytes[name] = max(self.peak_bytes[name], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self._stack:
+            self._close_segment(self._stack[-1][0])
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._close_segment(name)
+            self._stack.pop()
+            self.seconds[name] += elapsed - frame[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def iterate(self, name, iterable):
+        """Yield from `iterable`, timing each step as stage `name`"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def results(self):
+        if self.trace_memory:
+            return {name: peak for name, peak in self.peak_bytes.items()}
+        return {name: round(seconds, 4) for name, seconds in self.seconds.items()}
+
+def stage_worker(tool, mode, paths, result_path):
+    """
+    Run one tool stage by stage in this process and write per-stage results as JSON.
+
+    `mode` is 'time' (seconds per stage) or 'memory' (peak traced bytes per
+    stage, run under tracemalloc).
+    """
+    clock = StageClock(trace_memory=mode == 'memory')
+    if clock.trace_memory:
+        tracemalloc.start()
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if tool == 'simplify':
+            simplify = load_script('simplify_census_data', SIMPLIFY_SCRIPT)
+            input_path, output_path = paths
+            # Same streaming pipeline as the CLI, one partition in flight
+            documents = clock.iterate('parse', simplify.iter_json_documents(input_path))
+            partitions = clock.iterate('partition', simplify.iter_partitions(documents))
+            records = clock.iterate('transform', simplify.transform_partitions(partitions))
+            with open(output_path, 'w', encoding='utf-8') as f:
+                with clock.stage('write'):
+                    simplify.write_simplified(records, f)
+        else:
+            update = load_script('update_relationships', UPDATE_SCRIPT)
+            data_path, spec_path, output_path = paths
+            with clock.stage('load'):
+                with open(data_path, 'r') as f:
+                    data = json.load(f)
+                people, definitions = update.load_relationship_spec(spec_path)
+            with clock.stage('apply'):
+                update.apply_relationships(data, people, definitions)
+            with clock.stage('write'):
+                with open(output_path, 'w') as f:
+                    json.dump(data, f, indent=2)
+
+    with open(result_path, 'w') as f:
+        json.dump(clock.results(), f)
+
+def run_stages(tool, paths, timeout, workdir):
+    """
+    Run stage_worker in child processes, once for timings and once for memory.
+
+    Returns:
+        {stage: {'seconds': ..., 'peakBytes': ...}}, or None on failure
+    """
+    stages = defaultdict(dict)
+    for mode, key in (('time', 'seconds'), ('memory', 'peakBytes')):
+        result_path = os.path.join(workdir, f'{tool}-stages-{mode}.json')
+        cmd = [sys.executable, os.path.abspath(__file__), '--stage-worker', tool, mode, *paths, result_path]
+        run = run_child(cmd, timeout)
+        if run['returncode'] != 0:
+            return None
+        with open(result_path) as f:
+            for name, value in json.load(f).items():
+                stages[name][key] = value
+    return dict(stages)
+
+# ----------------------------------------------------------------------------
+# Complexity fitting
+# ----------------------------------------------------------------------------
+
+def fit_power_law(xs, ys):
+    """
+    Least-squares fit of y = c * x^k in log-log space.
+
+    Returns:
+        (k, r_squared), or None with fewer than two usable points
+    """
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y and y > 0]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(p[0] for p in points) / n
+    mean_y = sum(p[1] for p in points) / n
+    sxx = sum((p[0] - mean_x) ** 2 for p in points)
+    if sxx == 0:
+        return None
+    sxy = sum((p[0] - mean_x) * (p[1] - mean_y) for p in points)
+    k = sxy / sxx
+    ss_tot = sum((p[1] - mean_y) ** 2 for p in points)
+    ss_res = sum((p[1] - (mean_y + k * (p[0] - mean_x))) ** 2 for p in points)
+    r_squared = 1 - ss_res / ss_tot if ss_tot else 1.0
+    return round(k, 3), round(r_squared, 3)
+
+def complexity_label(k):
+    if k < 0.3:
+        return 'O(1)'
+    if k < 1.2:
+        return 'O(n)'
+    if k < 1.6:
+        return 'O(n log n) or worse'
+    if k < 2.4:
+        return 'O(n^2)'
+    return 'O(n^3) or worse'
+
+def fit_results(results):
+    """Fitted exponents for each tool's runtime, peak memory and stages"""
+    fits = {}
+    for tool in ('simplify', 'update_relationships'):
+        rows = [r for r in results if r.get(tool) and r[tool]['returncode'] == 0]
+        if not rows:
+            continue
+        people = [r['corpus']['people'] for r in rows]
+        series = {
+            'seconds': [r[tool]['seconds'] for r in rows],
+            'peakRssBytes': [r[tool]['peakRssBytes'] for r in rows],
+        }
+        stage_rows = [r for r in rows if r[tool].get('stages')]
+        stage_names = stage_rows[0][tool]['stages'].keys() if stage_rows else []
+        for name in stage_names:
+            series[f'stage:{name}'] = [r[tool]['stages'][name].get('seconds') for r in stage_rows]
+            series[f'stage:{name}:peakBytes'] = [r[tool]['stages'][name].get('peakBytes') for r in stage_rows]
+
+        tool_fits = {}
+        for name, ys in series.items():
+            xs = people if not name.startswith('stage:') else [r['corpus']['people'] for r in stage_rows]
+            fit = fit_power_law(xs, ys)
+            if fit:
+                tool_fits[name] = {'exponent': fit[0], 'r2': fit[1], 'complexity': complexity_label(fit[0])}
+        if tool_fits:
+            fits[tool] = tool_fits
+    return fits
+
+# ----------------------------------------------------------------------------
+# Report
+# ----------------------------------------------------------------------------
+
+def format_run(run):
+    if run is None:
+        return f"{'skipped':>20}"
+    if run['timedOut']:
+        return f"{'timeout':>20}"
+    if run['returncode']:
+        return f"{'failed':>20}"
+    return f"{run['seconds']:>9.2f}s {run['peakRssBytes'] / 2 ** 20:>8.1f}MB"
+
+def print_report(results, fits):
+    print()
+    print(f"{'people':>9} {'records':>8} {'rels':>9} {'elements':>10} {'export MB':>10} "
+          f"{'simplify':>20} {'update_relationships':>20}")
+    for r in results:
+        c = r['corpus']
+        print(f"{c['people']:>9} {c['records']:>8} {c['relationships']:>9} {c['elements']:>10} "
+              f"{c['exportBytes'] / 2 ** 20:>10.1f} {format_run(r.get('simplify'))} "
+              f"{format_run(r.get('update_relationships'))}")
+
+    for tool in ('simplify', 'update_relationships'):
+        stage_rows = [r for r in results if r.get(tool) and r[tool].get('stages')]
+        if not stage_rows:
+            continue
+        names = list(stage_rows[0][tool]['stages'])
+        print(f"\n{tool} stages (seconds / peak traced MB)")
+        print(f"{'people':>9} " + ' '.join(f"{name:>20}" for name in names))
+        for r in stage_rows:
+            cells = []
+            for name in names:
+                stage = r[tool]['stages'].get(name, {})
+                cells.append(f"{stage.get('seconds', 0):>9.2f}s {stage.get('peakBytes', 0) / 2 ** 20:>8.1f}MB")
+            print(f"{r['corpus']['people']:>9} " + ' '.join(cells))
+
+    for tool, tool_fits in fits.items():
+        print(f"\n{tool} (fit of y ~ n^k over people)")
+        for name, fit in tool_fits.items():
+            print(f"  {name:<28} k={fit['exponent']:<6} r2={fit['r2']:<6} {fit['complexity']}")
+
+def benchmark(sizes, timeout, stages, seed, keep_dir=None):
+    """Run the benchmark for each corpus size and return per-size results"""
+    results = []
+    gave_up = set()
+    workdir_root = keep_dir or tempfile.mkdtemp(prefix='census-bench-')
+
+    try:
+        for size in sizes:
+            workdir = os.path.join(workdir_root, f'n{size}')
+            os.makedirs(workdir, exist_ok=True)
+
+            print(f"Generating corpus of {size} people...", flush=True)
+            started = time.perf_counter()
+            corpus = write_corpus(size, workdir, seed)
+            print(f"  {corpus['people']} people, {corpus['records']} records, {corpus['images']} images "
+                  f"({time.perf_counter() - started:.1f}s)", flush=True)
+
+            row = {'corpus': {k: v for k, v in corpus.items() if k not in ('export', 'spec')}}
+            simplified_path = os.path.join(workdir, 'simple.json')
+
+            if 'simplify' in gave_up:
+                row['simplify'] = None
+            else:
+                print("  simplify-census-data.py...", flush=True)
+                row['simplify'] = run_child(
+                    [sys.executable, SIMPLIFY_SCRIPT, corpus['export'], '-o', simplified_path], timeout)
+                if row['simplify']['returncode'] != 0:
+                    gave_up.add('simplify')
+                elif stages:
+                    row['simplify']['stages'] = run_stages(
+                        'simplify', [corpus['export'], os.path.join(workdir, 'stage-simple.json')], timeout, workdir)
+
+            if 'update_relationships' in gave_up or not os.path.exists(simplified_path):
+                row['update_relationships'] = None
+            else:
+                print("  update_relationships.py...", flush=True)
+                update_path = os.path.join(workdir, 'update.json')
+                shutil.copyfile(simplified_path, update_path)
+                row['update_relationships'] = run_child(
+                    [sys.executable, UPDATE_SCRIPT, update_path, '--spec', corpus['spec']], timeout)
+                if row['update_relationships']['returncode'] != 0:
+                    gave_up.add('update_relationships')
+                elif stages:
+                    row['update_relationships']['stages'] = run_stages(
+                        'update_relationships', [simplified_path, corpus['spec'], update_path], timeout, workdir)
+
+            results.append(row)
+            if not keep_dir:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        if not keep_dir:
+            shutil.rmtree(workdir_root, ignore_errors=True)
+
+    return results
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--stage-worker']:
+        stage_worker(argv[1], argv[2], argv[3:-1], argv[-1])
+        return 0
+
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the census simplify/update tools")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Corpus sizes in people')
+    parser.add_argument('--timeout', type=float, default=900, help='Seconds allowed per tool run')
+    parser.add_argument('--no-stages', action='store_true', help='Skip the per-stage timing and memory runs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', metavar='DIR', help='Keep generated corpora and outputs in DIR')
+    parser.add_argument('--report', help='Write results and fits as JSON')
+    args = parser.parse_args(argv)
+
+    results = benchmark(sorted(args.sizes), args.timeout, not args.no_stages, args.seed, args.keep)
+    fits = fit_results(results)
+    print_report(results, fits)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'sizes': sorted(args.sizes), 'results': results, 'fits': fits}, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+    failed = [r for r in results for tool in ('simplify', 'update_relationships')
+              if r.get(tool) and r[tool]['returncode'] and not r[tool]['timedOut']]
+    for r in failed:
+        for tool in ('simplify', 'update_relationships'):
+            if r.get(tool) and r[tool]['stderr']:
+                print(f"\n{tool} failed at {r['corpus']['people']} people:\n{r[tool]['stderr']}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    exit(main())
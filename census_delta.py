@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Compute and apply id-keyed deltas between two simplified census files.
+
+Records, people and relationship graph entries are matched by their `id` and
+compared using per-entity content hashes, so a patch only carries the entities
+that were added, removed or changed (and, for changes, only the changed fields).
+
+Usage:
+    python census_delta.py diff OLD.json NEW.json [-o PATCH.json]
+    python census_delta.py apply BASE.json PATCH.json [-o OUT.json]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+
+DELTA_VERSION = 1
+
+# Nested collections of a record that are diffed as entities of their own
+RECORD_COLLECTIONS = ('people', 'relationshipGraph')
+
+def canonical_value(value):
+    """
+    Normalize a value so its canonical JSON matches canonicalJson in censusDelta.js.
+
+    The canonical form covers strings, bools, null and integers up to 2**53.
+    Integral floats are hashed as integers (JS writes 1.0 as 1); other floats
+    are rejected because Python and JS format them differently (1e-07 / 1e-7).
+    """
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(f"Cannot hash non-integral number {value!r}; census deltas only support integers")
+        return int(value)
+    if isinstance(value, dict):
+        return {key: canonical_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [canonical_value(item) for item in value]
+    return value
+
+def canonical_json(value):
+    """Serialize a value deterministically for hashing (see canonical_value for what is supported)"""
+    return json.dumps(canonical_value(value), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+def content_hash(value):
+    """Content hash of any JSON value supported by canonical_value"""
+    return hashlib.sha1(canonical_json(value).encode('utf-8')).hexdigest()
+
+def index_by_id(entities, kind):
+    """Create lookup map: id -> entity, rejecting duplicate ids"""
+    indexed = {}
+    for entity in entities:
+        entity_id = entity.get('id')
+        if entity_id is None:
+            raise ValueError(f"{kind} entry without an id: {canonical_json(entity)[:80]}")
+        if entity_id in indexed:
+            raise ValueError(f"Duplicate {kind} id: {entity_id}")
+        indexed[entity_id] = entity
+    return indexed
+
+def diff_fields(old, new, skip=()):
+    """
+    Compare two flat entities field by field.
+
+    Returns:
+        (fields, removed_fields) where fields maps changed or added keys to
+        their new value and removed_fields lists keys missing from `new`
+    """
+    fields = {}
+    for key, value in new.items():
+        if key in skip:
+            continue
+        if key not in old or content_hash(old[key]) != content_hash(value):
+            fields[key] = value
+    removed_fields = [key for key in old if key not in new and key not in skip]
+    return fields, removed_fields
+
+def applied_order(old_ids, removed, added_ids):
+    """Order that apply_collection produces without an explicit order list"""
+    removed = set(removed)
+    return [i for i in old_ids if i not in removed] + list(added_ids)
+
+def diff_collection(old_list, new_list, kind, diff_entity):
+    """
+    Diff two lists of id-keyed entities.
+
+    Args:
+        old_list: Entities in the base document
+        new_list: Entities in the target document
+        kind: Entity label used in error messages
+        diff_entity: Callable(old, new) -> change dict or None
+
+    Returns:
+        Collection patch dict, or None when both lists are identical
+    """
+    old_map = index_by_id(old_list, kind)
+    new_map = index_by_id(new_list, kind)
+
+    added = [e for e in new_list if e['id'] not in old_map]
+    removed = [e['id'] for e in old_list if e['id'] not in new_map]
+
+    changed = {}
+    for entity in new_list:
+        old = old_map.get(entity['id'])
+        if old is None:
+            continue
+        change = diff_entity(old, entity)
+        if change:
+            changed[entity['id']] = change
+
+    patch = {}
+    if added:
+        patch['added'] = added
+    if removed:
+        patch['removed'] = removed
+    if changed:
+        patch['changed'] = changed
+
+    new_ids = [e['id'] for e in new_list]
+    default_order = applied_order([e['id'] for e in old_list], removed, [e['id'] for e in added])
+    if new_ids != default_order:
+        patch['order'] = new_ids
+
+    return patch or None
+
+def diff_flat_entity(old, new):
+    """Change dict for a person or relationship graph entry"""
+    if content_hash(old) == content_hash(new):
+        return None
+    fields, removed_fields = diff_fields(old, new)
+    change = {}
+    if fields:
+        change['fields'] = fields
+    if removed_fields:
+        change['removedFields'] = removed_fields
+    # Key order differences alone are not worth a change entry
+    return change or None
+
+def diff_record(old, new):
+    """Change dict for a record, recursing into its nested collections"""
+    if content_hash(old) == content_hash(new):
+        return None
+
+    fields, removed_fields = diff_fields(old, new, skip=RECORD_COLLECTIONS)
+    change = {}
+    if fields:
+        change['fields'] = fields
+    if removed_fields:
+        change['removedFields'] = removed_fields
+
+    for collection in RECORD_COLLECTIONS:
+        if collection not in old or collection not in new:
+            # Collection appeared or disappeared entirely; ship it as a field
+            if collection in new and collection not in old:
+                change.setdefault('fields', {})[collection] = new[collection]
+            elif collection in old and collection not in new:
+                change.setdefault('removedFields', []).append(collection)
+            continue
+        collection_patch = diff_collection(old[collection], new[collection], collection, diff_flat_entity)
+        if collection_patch:
+            change[collection] = collection_patch
+
+    return change or None
+
+def diff_documents(old_doc, new_doc):
+    """
+    Build a delta that turns `old_doc` into `new_doc`.
+
+    Args:
+        old_doc: Simplified census document ({"records": [...]})
+        new_doc: Simplified census document ({"records": [...]})
+
+    Returns:
+        Patch dict with base/target hashes, changed top-level fields and the
+        record-level changes
+    """
+    if ('records' in old_doc) != ('records' in new_doc):
+        raise ValueError("Both documents must have a records list (or neither)")
+
+    patch = {
+        "version": DELTA_VERSION,
+        "baseHash": content_hash(old_doc),
+        "targetHash": content_hash(new_doc),
+    }
+
+    # Top-level keys other than records (e.g. generatedAt) travel as plain fields
+    fields, removed_fields = diff_fields(old_doc, new_doc, skip=('records',))
+    if fields:
+        patch['fields'] = fields
+    if removed_fields:
+        patch['removedFields'] = removed_fields
+
+    records_patch = diff_collection(old_doc.get('records', []), new_doc.get('records', []), 'record', diff_record)
+    if records_patch:
+        patch['records'] = records_patch
+
+    return patch
+
+def apply_fields(entity, change):
+    """Apply field-level changes to a copy of an entity"""
+    updated = dict(entity)
+    for key in change.get('removedFields', []):
+        updated.pop(key, None)
+    updated.update(change.get('fields', {}))
+    return updated
+
+def apply_collection(entities, collection_patch, apply_entity):
+    """Apply a collection patch produced by diff_collection"""
+    if not collection_patch:
+        return list(entities)
+
+    removed = set(collection_patch.get('removed', []))
+    changed = collection_patch.get('changed', {})
+
+    result = {}
+    for entity in entities:
+        entity_id = entity['id']
+        if entity_id in removed:
+            continue
+        change = changed.get(entity_id)
+        result[entity_id] = apply_entity(entity, change) if change else entity
+
+    missing = [i for i in changed if i not in result]
+    if missing:
+        raise ValueError(f"Patch changes unknown ids: {', '.join(missing[:5])}")
+
+    for entity in collection_patch.get('added', []):
+        result[entity['id']] = entity
+
+    order = collection_patch.get('order')
+    if order is None:
+        return list(result.values())
+    if set(order) != set(result):
+        raise ValueError("Patch order does not match the resulting ids")
+    return [result[i] for i in order]
+
+def apply_record(record, change):
+    """Apply a record change, including nested collection patches"""
+    updated = apply_fields(record, change)
+    for collection in RECORD_COLLECTIONS:
+        if collection in change:
+            updated[collection] = apply_collection(record.get(collection, []), change[collection], apply_fields)
+    return updated
+
+def apply_delta(base_doc, patch, verify=True):
+    """
+    Apply a delta produced by diff_documents.
+
+    Args:
+        base_doc: Document the patch was computed against
+        patch: Patch dict
+        verify: Check base and target content hashes
+
+    Returns:
+        New document; `base_doc` is not modified
+    """
+    if patch.get('version') != DELTA_VERSION:
+        raise ValueError(f"Unsupported delta version: {patch.get('version')}")
+
+    if verify and content_hash(base_doc) != patch['baseHash']:
+        raise ValueError("Base document does not match the patch baseHash")
+
+    result = apply_fields(base_doc, patch)
+    if 'records' in base_doc or 'records' in patch:
+        result['records'] = apply_collection(base_doc.get('records', []), patch.get('records'), apply_record)
+
+    if verify and content_hash(result) != patch['targetHash']:
+        raise ValueError("Patched document does not match the patch targetHash")
+
+    return result
+
+def summarize_delta(patch):
+    """Count added/removed/changed entities per kind"""
+    counts = {kind: {'added': 0, 'removed': 0, 'changed': 0} for kind in ('records',) + RECORD_COLLECTIONS}
+
+    def count(kind, collection_patch):
+        counts[kind]['added'] += len(collection_patch.get('added', []))
+        counts[kind]['removed'] += len(collection_patch.get('removed', []))
+        counts[kind]['changed'] += len(collection_patch.get('changed', {}))
+
+    records_patch = patch.get('records') or {}
+    count('records', records_patch)
+    for change in records_patch.get('changed', {}).values():
+        for collection in RECORD_COLLECTIONS:
+            if collection in change:
+                count(collection, change[collection])
+    # Records whose only differences are nested do not count as changed records
+    counts['records']['changed'] = sum(
+        1 for change in records_patch.get('changed', {}).values()
+        if 'fields' in change or 'removedFields' in change
+    )
+    return counts
+
+def load_json(filepath):
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        return json.load(f)
+
+def write_json(data, filepath):
+    if filepath:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+    else:
+        json.dump(data, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    diff_parser = subparsers.add_parser('diff', help='Write the delta between two simplified files')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    diff_parser.add_argument('-o', '--output', help='Patch file (default: stdout)')
+
+    apply_parser = subparsers.add_parser('apply', help='Apply a delta to a simplified file')
+    apply_parser.add_argument('base')
+    apply_parser.add_argument('patch')
+    apply_parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    apply_parser.add_argument('--no-verify', action='store_true', help='Skip content hash checks')
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'diff':
+            patch = diff_documents(load_json(args.old), load_json(args.new))
+            write_json(patch, args.output)
+            for kind, c in summarize_delta(patch).items():
+                print(f"{kind}: +{c['added']} -{c['removed']} ~{c['changed']}", file=sys.stderr)
+        else:
+            result = apply_delta(load_json(args.base), load_json(args.patch), verify=not args.no_verify)
+            write_json(result, args.output)
+            print("✓ Delta applied.", file=sys.stderr)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Binary pre-parsed element cache for complex census exports.
+
+Stores the parts of the element graph the simplifier reads (ids, partition
+keys, element/field/relationship types, field text, attachedPersons/hints as
+JSON text, sub- and super-element edges) in a compact little-endian file that
+is loaded with mmap instead of being parsed as JSON. Strings are kept in a shared string table and decoded
+on access, so several worker processes opening the same cache share its pages.
+
+Layout:
+    header          HEADER struct (magic, version, counts, section offsets)
+    string offsets  (string_count + 1) x u32, byte offsets into string data
+    string data     UTF-8 bytes of every distinct string
+    elements        element_count x ELEMENT struct (string indices + edge ranges)
+    sub edges       sub_count x u32 (string index of the child id)
+    super edges     super_count x (u32 id, u32 order) string index pairs
+
+Usage:
+    python simplify-census-data.py INPUT.json -o OUTPUT.json --write-cache INPUT.ecache
+    python simplify-census-data.py INPUT.ecache -o OUTPUT.json [--workers N]
+    python census_element_cache.py info INPUT.ecache
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from itertools import groupby
+
+CACHE_SUFFIX = '.ecache'
+MAGIC = b'CENSELEM'
+VERSION = 2
+
+# magic, version, string_count, element_count, sub_count, super_count,
+# string_offsets_off, string_data_off, elements_off, sub_off, super_off
+HEADER = struct.Struct('<8sIIIII5Q')
+
+# id, partitionKey, elementType, fieldType, relType, text,
+# attachedPersons, hints (compact JSON text),
+# sub_start, sub_count, super_start, super_count
+ELEMENT = struct.Struct('<12I')
+U32 = struct.Struct('<I')
+EDGE = struct.Struct('<2I')
+
+NONE = 0xFFFFFFFF
+
+def is_element_cache(filepath):
+    """True if the path names an element cache file"""
+    return str(filepath).endswith(CACHE_SUFFIX)
+
+def _field_text(elem):
+    field_values = elem.get('fieldValues', [])
+    if field_values:
+        return field_values[0].get('origValue', {}).get('text')
+    return None
+
+def _json_text(value):
+    """Compact JSON for list fields copied verbatim (attachedPersons, hints)"""
+    if not value:
+        return None
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+class ElementCacheWriter:
+    """
+    Build a cache file incrementally from a stream of elements.
+
+    Only the packed rows, edges and string table are kept, so elements can be
+    added while the export is being read and transformed.
+    """
+
+    def __init__(self):
+        self._strings = {}
+        self._string_list = []
+        self._element_rows = bytearray()
+        self._sub_edges = bytearray()
+        self._super_edges = bytearray()
+        self._sub_count = 0
+        self._super_count = 0
+        self.element_count = 0
+
+    def _intern(self, value):
+        if value is None:
+            return NONE
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._string_list)
+            self._string_list.append(value)
+        return index
+
+    def add(self, elem):
+        """Append one complex export element dict"""
+        intern = self._intern
+        subs = elem.get('subElements', [])
+        supers = elem.get('superElements', [])
+        self._element_rows += ELEMENT.pack(
+            intern(elem['id']),
+            intern(elem.get('partitionKey')),
+            intern(elem.get('elementType')),
+            intern(elem.get('fieldType')),
+            intern(elem.get('relType')),
+            intern(_field_text(elem)),
+            intern(_json_text(elem.get('attachedPersons'))),
+            intern(_json_text(elem.get('hints'))),
+            self._sub_count, len(subs),
+            self._super_count, len(supers),
+        )
+        for sub in subs:
+            self._sub_edges += U32.pack(intern(sub['id']))
+        for sup in supers:
+            self._super_edges += EDGE.pack(intern(sup.get('id')), intern(sup.get('order')))
+        self._sub_count += len(subs)
+        self._super_count += len(supers)
+        self.element_count += 1
+
+    def tee(self, documents):
+        """Pass documents through unchanged, adding their elements on the way"""
+        for doc in documents:
+            for elem in doc.get('elements', []):
+                self.add(elem)
+            yield doc
+
+    def write(self, filepath):
+        """
+        Write the cache file.
+
+        Returns:
+            Number of elements written
+        """
+        encoded = [s.encode('utf-8') for s in self._string_list]
+        string_offsets = bytearray()
+        offset = 0
+        for data in encoded:
+            string_offsets += U32.pack(offset)
+            offset += len(data)
+        string_offsets += U32.pack(offset)
+        string_data = b''.join(encoded)
+
+        string_offsets_off = HEADER.size
+        string_data_off = string_offsets_off + len(string_offsets)
+        # Keep fixed-width sections 4-byte aligned for memoryview casts
+        elements_off = (string_data_off + len(string_data) + 3) & ~3
+        sub_off = elements_off + len(self._element_rows)
+        super_off = sub_off + len(self._sub_edges)
+
+        # Written to a temporary file and moved into place, so a crash never
+        # leaves a truncated cache behind
+        tmp_path = f'{filepath}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(
+                    MAGIC, VERSION, len(self._string_list), self.element_count, self._sub_count, self._super_count,
+                    string_offsets_off, string_data_off, elements_off, sub_off, super_off,
+                ))
+                f.write(string_offsets)
+                f.write(string_data)
+                f.write(b'\0' * (elements_off - string_data_off - len(string_data)))
+                f.write(self._element_rows)
+                f.write(self._sub_edges)
+                f.write(self._super_edges)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return self.element_count
+
+def write_element_cache(elements, filepath):
+    """
+    Write elements to a binary cache file.
+
+    Args:
+        elements: Iterable of complex export element dicts
+        filepath: Destination path (conventionally ending in .ecache)
+
+    Returns:
+        Number of elements written
+    """
+    writer = ElementCacheWriter()
+    for elem in elements:
+        writer.add(elem)
+    return writer.write(filepath)
+
+class ElementCache:
+    """Memory-mapped element cache file"""
+
+    def __init__(self, filepath):
+        self.path = str(filepath)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self._mmap)
+        size = len(self._mmap)
+        if size < HEADER.size:
+            raise ValueError(f"{self.path} is too short to be an element cache")
+
+        (magic, version, self.string_count, self.element_count, sub_count, super_count,
+         string_offsets_off, string_data_off, self.elements_off, sub_off, super_off) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not an element cache")
+        if version != VERSION:
+            raise ValueError(f"Unsupported element cache version {version} in {self.path}")
+
+        # Memoryview slices silently stop at the end of the file, so a truncated
+        # cache would otherwise load as a smaller, valid-looking one
+        sections = (
+            ('string offsets', string_offsets_off, string_data_off - string_offsets_off),
+            ('elements', self.elements_off, self.element_count * ELEMENT.size),
+            ('sub edges', sub_off, 4 * sub_count),
+            ('super edges', super_off, 8 * super_count),
+        )
+        for name, offset, length in sections:
+            if length < 0 or offset + length > size:
+                raise ValueError(f"{self.path} is truncated or corrupt ({name} section ends past the file)")
+
+        # Zero-copy typed views over the mapped sections
+        self.string_offsets = self.buffer[string_offsets_off:string_data_off].cast('I')
+        if len(self.string_offsets) != self.string_count + 1:
+            raise ValueError(f"{self.path} is corrupt (string offsets do not match the string count)")
+        if string_data_off + self.string_offsets[-1] > size:
+            raise ValueError(f"{self.path} is truncated or corrupt (string data section ends past the file)")
+        self.string_data = self.buffer[string_data_off:string_data_off + self.string_offsets[-1]]
+        self.sub_ids = self.buffer[sub_off:sub_off + 4 * sub_count].cast('I')
+        self.super_edges = self.buffer[super_off:super_off + 8 * super_count].cast('I')
+
+        # Decoded partition keys, types and orders (few distinct values, so kept)
+        self._symbols = {}
+
+    def string_view(self, index):
+        """Zero-copy UTF-8 bytes of a string table entry"""
+        return self.string_data[self.string_offsets[index]:self.string_offsets[index + 1]]
+
+    def string(self, index):
+        """Decode a string table entry (ids and text are decoded per use, not kept)"""
+        if index == NONE:
+            return None
+        return str(self.string_data[self.string_offsets[index]:self.string_offsets[index + 1]], 'utf-8')
+
+    def symbol(self, index):
+        """Decode a low-cardinality string table entry once and reuse it"""
+        value = self._symbols.get(index)
+        if value is None and index != NONE:
+            value = self._symbols[index] = self.string(index)
+        return value
+
+    def _decode(self, row):
+        """Build the element dict for one ELEMENT row"""
+        string = self.string
+        symbol = self.symbol
+        (id_index, partition_key, element_type, field_type, rel_type, text,
+         attached_persons, hints, sub_start, sub_count, super_start, super_count) = row
+
+        elem = {'id': string(id_index)}
+        if partition_key != NONE:
+            elem['partitionKey'] = symbol(partition_key)
+        if element_type != NONE:
+            elem['elementType'] = symbol(element_type)
+        if field_type != NONE:
+            elem['fieldType'] = symbol(field_type)
+        if rel_type != NONE:
+            elem['relType'] = symbol(rel_type)
+        if text != NONE:
+            elem['fieldValues'] = [{'origValue': {'text': string(text)}}]
+        if attached_persons != NONE:
+            elem['attachedPersons'] = json.loads(string(attached_persons))
+        if hints != NONE:
+            elem['hints'] = json.loads(string(hints))
+        if sub_count:
+            elem['subElements'] = [{'id': string(i)} for i in self.sub_ids[sub_start:sub_start + sub_count]]
+        if super_count:
+            pairs = self.super_edges[2 * super_start:2 * (super_start + super_count)]
+            elem['superElements'] = [
+                {'id': string(pairs[n])} if pairs[n + 1] == NONE
+                else {'id': string(pairs[n]), 'order': symbol(pairs[n + 1])}
+                for n in range(0, len(pairs), 2)
+            ]
+        return elem
+
+    def element(self, index):
+        """Element dict for one row"""
+        return self._decode(ELEMENT.unpack_from(self.buffer, self.elements_off + index * ELEMENT.size))
+
+    def iter_elements(self, start=0, stop=None):
+        """Yield element dicts for rows [start, stop); nothing is kept once the caller drops them"""
+        stop = self.element_count if stop is None else stop
+        rows = self.buffer[self.elements_off + start * ELEMENT.size:self.elements_off + stop * ELEMENT.size]
+        return map(self._decode, ELEMENT.iter_unpack(rows))
+
+    def partition_runs(self):
+        """
+        Yield (partition_key, start, stop) for each run of consecutive rows
+        sharing a partitionKey, without decoding the rows.
+
+        Rows without a partitionKey report ''.
+        """
+        keys = self.buffer[self.elements_off:self.elements_off + self.element_count * ELEMENT.size].cast('I')[1::ELEMENT.size // 4]
+        start = 0
+        for index, key_index in groupby(keys):
+            stop = start + sum(1 for _ in key_index)
+            yield self.symbol(index) or '', start, stop
+            start = stop
+
+    def partition(self, ranges):
+        """CachedPartition over the given [start, stop) row ranges"""
+        return CachedPartition(self, ranges)
+
+class CachedPartition:
+    """
+    Row ranges of one partition in a cache file, decoded when iterated.
+
+    Pickles as (path, ranges), so a worker process decodes the partition from
+    its own mapping of the file instead of receiving the decoded elements.
+    """
+
+    def __init__(self, cache, ranges):
+        self._cache = cache
+        self.ranges = list(ranges)
+
+    def __len__(self):
+        return sum(stop - start for start, stop in self.ranges)
+
+    def __iter__(self):
+        for start, stop in self.ranges:
+            yield from self._cache.iter_elements(start, stop)
+
+    def __reduce__(self):
+        return (_cached_partition, (self._cache.path, self.ranges))
+
+    def __repr__(self):
+        return f"CachedPartition({self._cache.path!r}, {self.ranges!r})"
+
+_OPEN_CACHES = {}
+
+def open_element_cache(filepath):
+    """Open a cache file once per process"""
+    filepath = str(filepath)
+    cache = _OPEN_CACHES.get(filepath)
+    if cache is None:
+        cache = _OPEN_CACHES[filepath] = ElementCache(filepath)
+    return cache
+
+def _cached_partition(filepath, ranges):
+    return open_element_cache(filepath).partition(ranges)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] != 'info':
+        print('Usage:' + __doc__.split('Usage:')[1].rstrip())
+        return 1
+
+    try:
+        cache = open_element_cache(argv[1])
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Elements: {cache.element_count}")
+    print(f"Strings:  {cache.string_count} ({len(cache.string_data)} bytes)")
+    print(f"Edges:    {len(cache.sub_ids)} sub, {len(cache.super_edges) // 2} super")
+    return 0
+
+if __name__ == '__main__':
+    exit(main())
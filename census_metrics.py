@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Lightweight metrics for census batch runs.
+
+Collects counters, gauges and histograms in memory and writes them as a
+Prometheus textfile (for the node-exporter textfile collector) and as JSON
+lines (one event per processed image plus a final summary).
+"""
+
+import json
+import math
+import os
+import time
+
+# Default histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonically increasing value, optionally split by labels"""
+    type_name = 'counter'
+
+    def __init__(self, name, help_text, label_values=None):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        # Export zeros up front so scrapes see the series before the first increment
+        for labels in label_values or [{}]:
+            self.values[_label_key(labels)] = 0
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError(f"Counter {self.name} cannot decrease")
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, key, value
+
+    def merge(self, other):
+        for key, value in other.values.items():
+            self.values[key] = self.values.get(key, 0) + value
+
+    def snapshot(self):
+        if list(self.values) in ([], [()]):
+            return self.values.get((), 0)
+        return {_format_labels(key): value for key, value in sorted(self.values.items())}
+
+class Gauge(Counter):
+    """Value that can be set to anything; not exported until set"""
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self.values = {}
+
+    def set(self, value, **labels):
+        self.values[_label_key(labels)] = value
+
+    def merge(self, other):
+        self.values.update(other.values)
+
+    def snapshot(self):
+        # An unset gauge is null in the JSON summary, not 0 (a 1970 timestamp)
+        if not self.values:
+            return None
+        return super().snapshot()
+
+class Histogram:
+    """Cumulative bucketed distribution of observed values"""
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.bucket_counts[i] += 1
+                break
+
+    def samples(self):
+        cumulative = 0
+        for upper, count in zip(self.buckets, self.bucket_counts):
+            cumulative += count
+            yield f'{self.name}_bucket', (('le', _format_value(float(upper))),), cumulative
+        yield f'{self.name}_sum', (), self.sum
+        yield f'{self.name}_count', (), self.count
+
+    def merge(self, other):
+        if other.buckets != self.buckets:
+            raise ValueError(f"Histogram {self.name} bucket mismatch")
+        self.bucket_counts = [a + b for a, b in zip(self.bucket_counts, other.bucket_counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.sum}
+
+class MetricsRegistry:
+    """Collection of named metrics plus per-image events for a batch run"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.events = []
+        self.started_at = time.time()
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            if existing.type_name != metric.type_name:
+                raise ValueError(f"Metric {metric.name} already registered as {existing.type_name}")
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_values=None):
+        return self._register(Counter(name, help_text, label_values))
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def merge(self, other):
+        """Fold metrics collected elsewhere (e.g. in a worker process) into this registry"""
+        for name, metric in other.metrics.items():
+            if name in self.metrics:
+                self.metrics[name].merge(metric)
+            else:
+                self.metrics[name] = metric
+        self.events.extend(other.events)
+
+    def record_event(self, event, **fields):
+        """Record one JSON lines event (e.g. a processed image)"""
+        self.events.append({"ts": round(time.time(), 3), "event": event, **fields})
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for sample_name, label_key, value in metric.samples():
+                lines.append(f'{sample_name}{_format_labels(label_key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus_textfile(self, filepath):
+        """Write the textfile atomically so node-exporter never reads a partial file"""
+        tmp_path = f'{filepath}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, filepath)
+
+    def write_json_lines(self, filepath):
+        """Append the recorded events and a run summary as JSON lines"""
+        summary = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        with open(filepath, 'a', encoding='utf-8') as f:
+            for event in self.events:
+                f.write(json.dumps(event) + '\n')
+            f.write(json.dumps({
+                "ts": round(time.time(), 3),
+                "event": "run_summary",
+                "durationSeconds": round(time.time() - self.started_at, 6),
+                "metrics": summary,
+            }) + '\n')
+
+class CensusMetrics(MetricsRegistry):
+    """Registry with the metrics reported by the census simplifier"""
+
+    def __init__(self):
+        super().__init__()
+        self.images = self.counter('census_images_processed_total', 'Images transformed')
+        self.elements = self.counter('census_elements_processed_total', 'Elements read from complex exports')
+        self.records = self.counter('census_records_total', 'Records written to simplified output')
+        self.people = self.counter('census_people_total', 'People written to simplified output')
+        self.relationships = self.counter('census_relationships_total', 'Relationship graph entries written')
+        self.records_dropped = self.counter(
+            'census_records_dropped_total', 'Records skipped because they had no PERSON subelements')
+        self.people_dropped = self.counter(
+            'census_people_dropped_total',
+            'Record subelements not turned into people, by reason (missing element or not a PERSON)',
+            label_values=[{'reason': 'missing'}, {'reason': 'not_person'}])
+        self.walks_truncated = self.counter(
+            'census_person_walks_truncated_total', 'People whose subelement walk was cut short by max_depth')
+        self.errors = self.counter('census_errors_total', 'Runs that failed with an exception')
+        self.last_success = self.gauge(
+            'census_last_success_timestamp_seconds', 'Unix time of the last successful run')
+        self.image_duration = self.histogram(
+            'census_image_duration_seconds', 'Time to transform one image', LATENCY_BUCKETS)
+        self.elements_per_image = self.histogram(
+            'census_elements_per_image', 'Elements in one image', COUNT_BUCKETS)
+        self.records_per_image = self.histogram(
+            'census_records_per_image', 'Records written for one image', COUNT_BUCKETS)
+        self.people_per_image = self.histogram(
+            'census_people_per_image', 'People written for one image', COUNT_BUCKETS)
+        self.relationships_per_image = self.histogram(
+            'census_relationships_per_image', 'Relationship graph entries written for one image', COUNT_BUCKETS)
+
+    def carry_forward_last_success(self, textfile):
+        """
+        Copy census_last_success_timestamp_seconds from a previous textfile.
+
+        Used on failed runs, so rewriting the textfile keeps the time of the
+        last good run instead of dropping or zeroing it.
+        """
+        if self.last_success.values:
+            return
+        try:
+            with open(textfile, 'r', encoding='utf-8') as f:
+                for line in f:
+                    name, _, value = line.strip().partition(' ')
+                    if name == self.last_success.name:
+                        self.last_success.set(float(value))
+                        return
+        except (OSError, ValueError):
+            pass
+
+    def observe_image(self, image_id, element_count, simplified, duration):
+        """Record the totals and per-image distributions for one transformed image"""
+        records = simplified['records']
+        people = sum(len(r['people']) for r in records)
+        relationships = sum(len(r.get('relationshipGraph', [])) for r in records)
+
+        self.images.inc()
+        self.elements.inc(element_count)
+        self.records.inc(len(records))
+        self.people.inc(people)
+        self.relationships.inc(relationships)
+
+        self.image_duration.observe(duration)
+        self.elements_per_image.observe(element_count)
+        self.records_per_image.observe(len(records))
+        self.people_per_image.observe(people)
+        self.relationships_per_image.observe(relationships)
+
+        self.record_event(
+            "image_processed",
+            image=image_id,
+            elements=element_count,
+            records=len(records),
+            people=people,
+            relationships=relationships,
+            durationSeconds=round(duration, 6),
+        )
@@ -0,0 +1,45 @@
+import { execFileSync } from 'child_process';
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { fileURLToPath } from 'url';
+
+/**
+ * Check that simplify-census-data.py and simplify-census.js produce identical
+ * output for the shared fixture in fixtures/census-parity
+ *
+ * Usage: npm run check:census-parity
+ */
+
+const root = path.resolve(path.dirname(fileURLToPath(import.meta.url)), '..');
+const fixtureDir = path.join(root, 'fixtures', 'census-parity');
+const input = path.join(fixtureDir, 'export.json');
+const expected = fs.readFileSync(path.join(fixtureDir, 'expected-simple.json'), 'utf8');
+
+const tmpDir = fs.mkdtempSync(path.join(os.tmpdir(), 'census-parity-'));
+const python = process.env.PYTHON || 'python3';
+
+// Both converters take the same arguments: INPUT... -o OUTPUT
+const converters = {
+  python: [python, path.join(root, 'simplify-census-data.py')],
+  node: [process.execPath, path.join(root, 'simplify-census.js')]
+};
+
+let failed = false;
+try {
+  for (const [name, [command, script]] of Object.entries(converters)) {
+    const output = path.join(tmpDir, `${name}.json`);
+    execFileSync(command, [script, input, '-o', output], { cwd: root, stdio: ['ignore', 'ignore', 'inherit'] });
+
+    if (fs.readFileSync(output, 'utf8') === expected) {
+      console.log(`✓ ${name} output matches expected-simple.json`);
+    } else {
+      console.error(`✗ ${name} output differs from expected-simple.json (see ${output})`);
+      failed = true;
+    }
+  }
+} finally {
+  if (!failed) fs.rmSync(tmpDir, { recursive: true, force: true });
+}
+
+process.exitCode = failed ? 1 : 0;
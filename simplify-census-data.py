@@ -6,7 +6,17 @@ This script converts the complex nested structure from 3_1_3Q9M-CSVR-T893.json
 into a simplified format matching the structure used in the index-creation test.
 """
 
+import argparse
 import json
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from census_element_cache import ElementCacheWriter, is_element_cache, open_element_cache
+from census_metrics import CensusMetrics
 
 # Relationship type mappings
 RELATIONSHIP_ROLES = {
@@ -40,11 +50,146 @@ RELATIONSHIP_ROLES = {
     }
 }
 
-def load_complex_json(filepath):
-    """Load the complex JSON file"""
-    print(f"Loading {filepath}...")
+def iter_json_documents(filepath, chunk_size=1 << 20):
+    """
+    Yield each JSON document from a file holding one or more concatenated documents.
+
+    The file is read incrementally, so only the document being decoded (not the
+    whole multi-image export) is held as text at any one time. A single huge
+    document is still decoded as a whole.
+    """
+    decoder = json.JSONDecoder()
     with open(filepath, 'r', encoding='utf-8-sig') as f:
-        return json.load(f)
+        buffer = ''
+        read_size = chunk_size
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                if eof:
+                    return
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            try:
+                doc, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Incomplete document; grow the read size so large documents
+                # are not re-decoded once per chunk
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                read_size *= 2
+                continue
+            yield doc
+            buffer = buffer[end:]
+            read_size = chunk_size
+
+
+def iter_partitions(documents):
+    """
+    Yield (partition_key, elements) for each image partition as soon as it is complete.
+
+    Elements are expected to be grouped by `partitionKey`, as in per-image
+    exports (one document per image, possibly continuing into the next
+    document) and film-level exports ordered by image. A partition is complete
+    when the partitionKey changes or the input ends, so besides the document
+    being decoded only the open partition is held in memory.
+
+    Elements of a partition that reappear after it was closed are spilled to a
+    temporary file and yielded as an extra piece of that partition at the end.
+    Elements without a partitionKey share the '' partition.
+    """
+    closed = set()
+    spill_dir = None
+    spill_files = {}
+    current_key = None
+    current = []
+
+    try:
+        for doc in documents:
+            for elem in doc.get('elements', []):
+                key = elem.get('partitionKey', '')
+                if key == current_key:
+                    current.append(elem)
+                    continue
+
+                if key in closed:
+                    if spill_dir is None:
+                        spill_dir = tempfile.mkdtemp(prefix='census-partitions-')
+                    spill = spill_files.get(key)
+                    if spill is None:
+                        path = os.path.join(spill_dir, f'{len(spill_files)}.jsonl')
+                        spill = spill_files[key] = open(path, 'w+', encoding='utf-8')
+                    spill.write(json.dumps(elem) + '\n')
+                    continue
+
+                if current:
+                    closed.add(current_key)
+                    yield current_key, current
+                current_key, current = key, [elem]
+
+        if current:
+            closed.add(current_key)
+            yield current_key, current
+        current = None
+
+        for key, spill in spill_files.items():
+            spill.seek(0)
+            elements = [json.loads(line) for line in spill]
+            warn_not_contiguous(key, elements)
+            yield key, elements
+    finally:
+        for spill in spill_files.values():
+            spill.close()
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+def iter_cache_partitions(cache):
+    """
+    Yield (partition_key, CachedPartition) for each partition of an element cache.
+
+    Same partitioning as iter_partitions, but partitions are row ranges: they
+    are decoded where they are transformed (in the worker process with
+    --workers), and late runs of a closed partition need no spilling.
+    """
+    closed = set()
+    late = {}
+    for key, start, stop in cache.partition_runs():
+        if key in closed:
+            late.setdefault(key, []).append((start, stop))
+            continue
+        closed.add(key)
+        yield key, cache.partition([(start, stop)])
+
+    for key, ranges in late.items():
+        partition = cache.partition(ranges)
+        warn_not_contiguous(key, partition)
+        yield key, partition
+
+def iter_input_documents(filepaths):
+    """Yield export documents from each JSON file in turn"""
+    for filepath in filepaths:
+        print(f"Loading {filepath}...")
+        yield from iter_json_documents(filepath)
+
+def iter_input_partitions(filepaths):
+    """
+    Yield (partition_key, elements) from JSON exports or a single binary element cache (.ecache).
+
+    A partition may continue from one JSON input into the next.
+    """
+    if len(filepaths) == 1 and is_element_cache(filepaths[0]):
+        print(f"Loading {filepaths[0]}...")
+        return iter_cache_partitions(open_element_cache(filepaths[0]))
+    return iter_partitions(iter_input_documents(filepaths))
+
+def warn_not_contiguous(key, elements):
+    print(f"Warning: partition {key or '(no partitionKey)'} is not contiguous; "
+          f"transforming {len(elements)} late elements separately")
 
 def build_element_map(elements):
     """Create lookup map: id -> element"""
@@ -71,9 +216,15 @@ def get_all_descendant_fields(elem_id, element_map, depth=0, max_depth=10):
 
     return fields
 
-def get_all_descendant_elements(elem_id, element_map, depth=0, max_depth=10):
-    """Recursively get all elements under this element"""
+def get_all_descendant_elements(elem_id, element_map, depth=0, max_depth=10, truncated=None):
+    """
+    Recursively get all elements under this element.
+
+    If `truncated` is a set, ids of elements skipped because of max_depth are added to it.
+    """
     if depth > max_depth:
+        if truncated is not None:
+            truncated.add(elem_id)
         return []
 
     elem = element_map.get(elem_id)
@@ -84,21 +235,25 @@ def get_all_descendant_elements(elem_id, element_map, depth=0, max_depth=10):
 
     # Recursively check subElements
     for sub in elem.get('subElements', []):
-        elements.extend(get_all_descendant_elements(sub['id'], element_map, depth + 1, max_depth))
+        elements.extend(get_all_descendant_elements(sub['id'], element_map, depth + 1, max_depth, truncated))
 
     return elements
 
-def build_person(person_elem, element_map):
+def build_person(person_elem, element_map, metrics=None):
     """Build simplified person object from PERSON element"""
     person_id = person_elem['id']
 
     # Get all descendant elements (not just FIELDs)
-    all_descendants = get_all_descendant_elements(person_id, element_map)
+    truncated = set()
+    all_descendants = get_all_descendant_elements(person_id, element_map, truncated=truncated)
+    if truncated and metrics is not None:
+        metrics.walks_truncated.inc()
 
     # Extract fields from FIELD elements
     given_name = None
     surname = None
     relationship = None
+    relationship_to_head = None
     occupation = None
     sex = ""
     age = ""
@@ -129,8 +284,10 @@ def build_person(person_elem, element_map):
                 sex = text
             elif ft == 'AGE':
                 age = text
-            elif ft == 'RACE':
+            elif ft == 'RACE' or ft == 'RACE_OR_COLOR':
                 race = text
+            elif ft == 'RELATIONSHIP_TO_HEAD':
+                relationship_to_head = text
 
     # Extract relationship from RELATIONSHIP elements
     for elem in all_descendants:
@@ -146,6 +303,10 @@ def build_person(person_elem, element_map):
                 relationship = rel_map.get(rel_type, rel_type)
                 break  # Use first relationship found
 
+    # Indexed relationship to the head of household (e.g. 1950 census) wins
+    if relationship_to_head:
+        relationship = relationship_to_head
+
     # IDs of people whose surnames should be removed (not explicit in document)
     no_surname_ids = [
         "1:1:X7YY-NPRG",  # Reamy
@@ -170,8 +331,8 @@ def build_person(person_elem, element_map):
         "isPrimary": False,
         "isVisible": False,
         "relationships": [],
-        "attachedPersons": [],
-        "hints": []
+        "attachedPersons": person_elem.get('attachedPersons') or [],
+        "hints": person_elem.get('hints') or []
     }
 
     # Add occupation if present
@@ -305,7 +466,7 @@ def build_relationship_graph(all_relationships, person_map):
 
     return graph
 
-def build_record(record_elem, element_map):
+def build_record(record_elem, element_map, metrics=None):
     """Build simplified record object from RECORD element"""
     record_id = record_elem['id']
     person_ids = [sub['id'] for sub in record_elem.get('subElements', [])]
@@ -315,7 +476,9 @@ def build_record(record_elem, element_map):
     for pid in person_ids:
         person_elem = element_map.get(pid)
         if person_elem and person_elem.get('elementType') == 'PERSON':
-            people.append(build_person(person_elem, element_map))
+            people.append(build_person(person_elem, element_map, metrics))
+        elif metrics is not None:
+            metrics.people_dropped.inc(reason='missing' if not person_elem else 'not_person')
 
     # Create person map for relationship lookups
     person_map = {p['id']: p for p in people}
@@ -456,8 +619,9 @@ def extract_document_metadata(elements):
 
     return date, place
 
-def transform_to_simplified(complex_data):
+def transform_to_simplified(complex_data, metrics=None):
     """Main transformation function"""
+    started = time.perf_counter()
     elements = complex_data.get('elements', [])
     print(f"Processing {len(elements)} elements...")
 
@@ -472,7 +636,7 @@ def transform_to_simplified(complex_data):
     records = []
     for elem in elements:
         if elem.get('elementType') == 'RECORD':
-            record = build_record(elem, element_map)
+            record = build_record(elem, element_map, metrics)
             # Use document-level date/place if record doesn't have them
             if not record['date']:
                 record['date'] = doc_date
@@ -480,37 +644,153 @@ def transform_to_simplified(complex_data):
                 record['place'] = doc_place
             if record['people']:  # Only include records with people
                 records.append(record)
+            elif metrics is not None:
+                metrics.records_dropped.inc()
 
-    return {"records": records}
+    simplified = {"records": records}
 
-def main():
-    input_file = '/Users/haymcarthur/User Tests/ai-auto-index/3_1_3Q9M-CSVR-T893.json'
-    output_file = '/Users/haymcarthur/User Tests/ai-auto-index/KentuckyCensus-simple.json'
+    if metrics is not None:
+        image_id = elements[0].get('partitionKey', '') if elements else ''
+        metrics.observe_image(image_id, len(elements), simplified, time.perf_counter() - started)
 
-    try:
-        complex_data = load_complex_json(input_file)
+    return simplified
 
-        print("Transforming data...")
-        simplified_data = transform_to_simplified(complex_data)
+def transform_partition(partition_key, elements):
+    """Transform one image partition with its own metrics (safe to run in a worker process)"""
+    metrics = CensusMetrics()
+    print(f"Partition {partition_key or '(no partitionKey)'}:")
+    # Cached partitions are decoded here, i.e. in the worker
+    simplified = transform_to_simplified({"elements": list(elements)}, metrics)
+    return simplified, metrics
 
-        print(f"Found {len(simplified_data['records'])} records with people")
+def transform_partitions(partitions, workers=1, metrics=None):
+    """
+    Transform each partition independently and yield its records, in partition order.
+
+    Each partition gets its own element map and document-level date/place.
+    With several workers at most `workers` partitions are submitted at a time,
+    so partitions are not queued up in memory faster than they are transformed.
+
+    Args:
+        partitions: Iterable of (partition_key, elements), e.g. from iter_partitions
+        workers: Number of worker processes; 1 transforms in this process
+        metrics: Optional CensusMetrics to merge per-partition metrics into
+    """
+    def collect(result):
+        simplified, partition_metrics = result
+        if metrics is not None:
+            metrics.merge(partition_metrics)
+        return simplified['records']
+
+    if workers <= 1:
+        for key, elements in partitions:
+            yield from collect(transform_partition(key, elements))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for key, elements in partitions:
+            pending.append(executor.submit(transform_partition, key, elements))
+            del elements
+            if len(pending) >= workers:
+                yield from collect(pending.popleft().result())
+        while pending:
+            yield from collect(pending.popleft().result())
+
+def write_simplified(records, f):
+    """
+    Stream records to `f` as {"records": [...]}, matching json.dump(..., indent=2).
 
-        # Count total people
-        total_people = sum(len(record['people']) for record in simplified_data['records'])
+    Returns:
+        (record count, people count)
+    """
+    record_count = 0
+    people_count = 0
+    for record in records:
+        f.write('{\n  "records": [\n    ' if record_count == 0 else ',\n    ')
+        f.write(json.dumps(record, indent=2).replace('\n', '\n    '))
+        record_count += 1
+        people_count += len(record['people'])
+    f.write('\n  ]\n}' if record_count else '{\n  "records": []\n}')
+    return record_count, people_count
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transform complex census JSON data into simplified format")
+    parser.add_argument('inputs', nargs='+', metavar='INPUT',
+                        help='Complex export JSON file(s), read in order, or a single .ecache file')
+    parser.add_argument('-o', '--output', required=True, help='Simplified JSON output file')
+    parser.add_argument('--write-cache', metavar='PATH',
+                        help='Also write the parsed elements to a binary .ecache file for faster reloads')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Transform image partitions in this many worker processes')
+    parser.add_argument('--metrics-textfile',
+                        help='Write run metrics as a Prometheus textfile (node-exporter textfile collector)')
+    parser.add_argument('--metrics-jsonl', help='Append per-image events and a run summary as JSON lines')
+    args = parser.parse_args(argv)
+    if any(is_element_cache(path) for path in args.inputs):
+        if len(args.inputs) > 1:
+            parser.error('an .ecache input cannot be combined with other inputs')
+        if args.write_cache:
+            parser.error('--write-cache needs JSON inputs')
+    return args
+
+def write_metrics(metrics, args):
+    """Write collected metrics to the configured outputs"""
+    if args.metrics_textfile:
+        metrics.write_prometheus_textfile(args.metrics_textfile)
+        print(f"Metrics written to {args.metrics_textfile}")
+    if args.metrics_jsonl:
+        metrics.write_json_lines(args.metrics_jsonl)
+        print(f"Metrics appended to {args.metrics_jsonl}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_file = args.output
+    metrics = CensusMetrics()
+
+    try:
+        cache_writer = None
+        if args.write_cache:
+            cache_writer = ElementCacheWriter()
+            partitions = iter_partitions(cache_writer.tee(iter_input_documents(args.inputs)))
+        else:
+            partitions = iter_input_partitions(args.inputs)
+
+        # Records are streamed to a temporary file and moved into place on success
+        print(f"Transforming data and writing to {output_file}...")
+        tmp_output = f'{output_file}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_output, 'w', encoding='utf-8') as f:
+                records = transform_partitions(partitions, args.workers, metrics)
+                record_count, total_people = write_simplified(records, f)
+            os.replace(tmp_output, output_file)
+        finally:
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
+
+        print(f"Processed {metrics.images.value()} image partition(s)")
+        print(f"Found {record_count} records with people")
         print(f"Total people: {total_people}")
 
-        print(f"Writing to {output_file}...")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(simplified_data, f, indent=2)
+        if cache_writer is not None:
+            count = cache_writer.write(args.write_cache)
+            print(f"Wrote {count} elements to {args.write_cache}")
 
         print("✓ Done! Transformation complete.")
+        metrics.last_success.set(time.time())
 
     except Exception as e:
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
+        metrics.errors.inc()
+        metrics.record_event("run_failed", input=args.inputs, error=str(e))
+        if args.metrics_textfile:
+            metrics.carry_forward_last_success(args.metrics_textfile)
+        write_metrics(metrics, args)
         return 1
 
+    write_metrics(metrics, args)
     return 0
 
 if __name__ == '__main__':
@@ -1,43 +1,241 @@
 import fs from 'fs';
+import os from 'os';
+import path from 'path';
 
-// Read the complex census JSON
-const censusData = JSON.parse(fs.readFileSync('./1950Census.json', 'utf8').replace(/^\uFEFF/, ''));
+/**
+ * Transform complex census JSON data into simplified format.
+ *
+ * Node port of simplify-census-data.py: produces byte-identical output for the
+ * same input. Elements are indexed once in a Map and each person's subtree is
+ * walked once, instead of scanning every element for every field lookup.
+ *
+ * Usage (same arguments as simplify-census-data.py):
+ *   node simplify-census.js INPUT.json [INPUT.json ...] -o OUTPUT.json
+ *
+ * Inputs may hold several concatenated export documents; they are read as a
+ * stream one document at a time, and each image partition is transformed and
+ * written as soon as its `partitionKey` run ends.
+ */
 
-// Helper to get field value by traversing the structure
-const getFieldValue = (censusData, elementId, fieldType) => {
-  // Find the element
-  const element = censusData.elements.find(el => el.id === elementId);
-  if (!element) return null;
+// Relationship type mappings
+const RELATIONSHIP_ROLES = {
+  PARENT_CHILD: { FIRST: 'PARENT', SECOND: 'CHILD' },
+  GRAND_PARENT: { FIRST: 'GRANDPARENT', SECOND: 'GRANDCHILD' },
+  PARENT_CHILD_IN_LAW: { FIRST: 'PARENT_IN_LAW', SECOND: 'CHILD_IN_LAW' },
+  COUPLE: { FIRST: 'SPOUSE', SECOND: 'SPOUSE' },
+  SIBLING: { FIRST: 'SIBLING', SECOND: 'SIBLING' },
+  SIBLING_IN_LAW: { FIRST: 'SIBLING_IN_LAW', SECOND: 'SIBLING_IN_LAW' },
+  AUNT_OR_UNCLE: { FIRST: 'AUNT_OR_UNCLE', SECOND: 'NIECE_OR_NEPHEW' }
+};
+
+// Readable labels for a person's first relationship
+const RELATIONSHIP_LABELS = {
+  COUPLE: 'Spouse',
+  PARENT_CHILD: 'Child',
+  SIBLING: 'Sibling'
+};
+
+// IDs of people whose surnames should be removed (not explicit in document)
+const NO_SURNAME_IDS = new Set([
+  '1:1:X7YY-NPRG', // Reamy
+  '1:1:X7YY-2TSX', // Joseph
+  '1:1:X7YY-NPRB', // George
+  '1:1:X7YY-2TSF', // Christopher
+  '1:1:X7YY-2TS6' // Isaic
+]);
+
+const IGNORED_PLACES = new Set(['Ky', '-']);
+const MAX_DEPTH = 10;
+
+/**
+ * Yield each JSON document from a file holding one or more concatenated documents
+ * The file is streamed, so only the document being read is buffered as text;
+ * a single large document is still parsed whole
+ */
+export async function* readJsonDocuments(filepath) {
+  const stream = fs.createReadStream(filepath, { encoding: 'utf8' });
+  let buffer = '';
+  let depth = 0;
+  let inString = false;
+  let escaped = false;
+  let first = true;
+
+  for await (let chunk of stream) {
+    if (first) {
+      chunk = chunk.replace(/^\uFEFF/, '');
+      first = false;
+    }
 
-  // If it's a FIELD with matching fieldType, return its value
-  if (element.elementType === 'FIELD' && element.fieldType === fieldType) {
-    return element.fieldValues?.[0]?.origValue?.text || null;
+    let start = 0;
+    for (let i = 0; i < chunk.length; i++) {
+      const c = chunk[i];
+      if (inString) {
+        if (escaped) escaped = false;
+        else if (c === '\\') escaped = true;
+        else if (c === '"') inString = false;
+      } else if (c === '"') {
+        inString = true;
+      } else if (c === '{' || c === '[') {
+        depth++;
+      } else if (c === '}' || c === ']') {
+        depth--;
+        if (depth === 0) {
+          buffer += chunk.slice(start, i + 1);
+          yield JSON.parse(buffer);
+          buffer = '';
+          start = i + 1;
+        }
+      }
+    }
+    buffer += chunk.slice(start);
+  }
+
+  if (buffer.trim()) {
+    throw new Error(`Unexpected trailing data in ${filepath}`);
   }
+}
+
+const warnNotContiguous = (key, elements, log) =>
+  log(`Warning: partition ${key || '(no partitionKey)'} is not contiguous; transforming ${elements.length} late elements separately`);
+
+/**
+ * Yield [partitionKey, elements] for each image partition as soon as it is complete,
+ * matching iter_partitions in simplify-census-data.py
+ * A partition is complete when the partitionKey changes or the input ends. Elements of
+ * a partition that reappear after it was closed are spilled to a temporary file and
+ * yielded as an extra piece of that partition at the end
+ */
+export async function* iterPartitions(documents, log = () => {}) {
+  const closed = new Set();
+  const spillFiles = new Map();
+  let spillDir = null;
+  let currentKey = null;
+  let current = [];
+
+  try {
+    for await (const doc of documents) {
+      for (const elem of doc.elements || []) {
+        const key = elem.partitionKey || '';
+        if (key === currentKey) {
+          current.push(elem);
+          continue;
+        }
+
+        if (closed.has(key)) {
+          if (!spillDir) spillDir = fs.mkdtempSync(path.join(os.tmpdir(), 'census-partitions-'));
+          if (!spillFiles.has(key)) {
+            const file = path.join(spillDir, `${spillFiles.size}.jsonl`);
+            spillFiles.set(key, { file, fd: fs.openSync(file, 'w') });
+          }
+          fs.writeSync(spillFiles.get(key).fd, `${JSON.stringify(elem)}\n`);
+          continue;
+        }
 
-  // If it has subElements, recursively search them
-  if (element.subElements && element.subElements.length > 0) {
-    for (const subEl of element.subElements) {
-      const value = getFieldValue(censusData, subEl.id, fieldType);
-      if (value) return value;
+        if (current.length > 0) {
+          closed.add(currentKey);
+          yield [currentKey, current];
+        }
+        currentKey = key;
+        current = [elem];
+      }
     }
+
+    if (current.length > 0) {
+      closed.add(currentKey);
+      yield [currentKey, current];
+    }
+    current = null;
+
+    for (const [key, spill] of spillFiles) {
+      fs.closeSync(spill.fd);
+      spill.fd = null;
+      const elements = fs.readFileSync(spill.file, 'utf8').split('\n').filter(Boolean).map(line => JSON.parse(line));
+      warnNotContiguous(key, elements, log);
+      yield [key, elements];
+    }
+  } finally {
+    for (const spill of spillFiles.values()) {
+      if (spill.fd !== null) fs.closeSync(spill.fd);
+    }
+    if (spillDir) fs.rmSync(spillDir, { recursive: true, force: true });
   }
+}
+
+/**
+ * Create lookup map: id -> element
+ */
+export const buildElementMap = (elements) => new Map(elements.map(elem => [elem.id, elem]));
+
+/**
+ * Collect an element and all its descendants (depth-first, pre-order) into `out`
+ */
+const collectDescendants = (elemId, elementMap, out, depth = 0) => {
+  if (depth > MAX_DEPTH) return out;
 
-  return null;
+  const elem = elementMap.get(elemId);
+  if (!elem) return out;
+
+  out.push(elem);
+  for (const sub of elem.subElements || []) {
+    collectDescendants(sub.id, elementMap, out, depth + 1);
+  }
+  return out;
 };
 
-// Get person data
-const getPerson = (personElement) => {
-  const personId = personElement.id;
+/**
+ * Text of a FIELD element's first value
+ */
+const getFieldText = (elem) => elem.fieldValues?.[0]?.origValue?.text || '';
 
-  // Search through all subElements for the fields we need
-  const givenName = getFieldValue(censusData, personId, 'NAME_GN') || '';
-  const surname = getFieldValue(censusData, personId, 'NAME_SURN') || '';
-  const relationship = getFieldValue(censusData, personId, 'RELATIONSHIP_TO_HEAD') || '';
-  const sex = getFieldValue(censusData, personId, 'SEX_CODE') || '';
-  const age = getFieldValue(censusData, personId, 'AGE') || '';
-  const race = getFieldValue(censusData, personId, 'RACE_OR_COLOR') || '';
+const fullName = (person) => `${person.givenName || ''} ${person.surname || ''}`.trim();
 
-  return {
+/**
+ * Build simplified person object from a PERSON element and its descendants
+ */
+const buildPerson = (personElem, descendants) => {
+  const personId = personElem.id;
+  let givenName = '';
+  let surname = '';
+  let relationship = '';
+  let relationshipToHead = '';
+  let occupation = '';
+  let sex = '';
+  let age = '';
+  let race = '';
+
+  for (const elem of descendants) {
+    if (elem.elementType === 'FIELD') {
+      const text = getFieldText(elem);
+      if (!text) continue;
+
+      switch (elem.fieldType) {
+        case 'NAME_GN': givenName = text; break;
+        case 'NAME_SURN': surname = text; break;
+        case 'OCCUPATION': occupation = text; break;
+        case 'SEX':
+        case 'SEX_CODE':
+        case 'GENDER': sex = text; break;
+        case 'AGE': age = text; break;
+        case 'RACE':
+        case 'RACE_OR_COLOR': race = text; break;
+        case 'RELATIONSHIP_TO_HEAD': relationshipToHead = text; break;
+      }
+    } else if (elem.elementType === 'RELATIONSHIP' && elem.relType && !relationship) {
+      // Use first relationship found
+      relationship = RELATIONSHIP_LABELS[elem.relType] || elem.relType;
+    }
+  }
+
+  // Indexed relationship to the head of household (e.g. 1950 census) wins
+  if (relationshipToHead) {
+    relationship = relationshipToHead;
+  }
+
+  if (NO_SURNAME_IDS.has(personId)) {
+    surname = '';
+  }
+
+  const person = {
     id: personId,
     givenName,
     surname,
@@ -45,35 +243,319 @@ const getPerson = (personElement) => {
     sex,
     age,
     race,
-    attachedPersons: personElement.attachedPersons || [],
-    hints: personElement.hints || []
+    isPrimary: false,
+    isVisible: false,
+    relationships: [],
+    attachedPersons: personElem.attachedPersons || [],
+    hints: personElem.hints || []
   };
+
+  if (occupation) {
+    person.occupation = occupation;
+  }
+
+  return person;
+};
+
+/**
+ * Role of one side of a relationship
+ */
+const getRole = (relType, order) => RELATIONSHIP_ROLES[relType]?.[order] ?? relType;
+
+/**
+ * Index this record's relationships by person: person id -> relationship dicts
+ */
+const extractPeopleRelationships = (allRelationships, personMap) => {
+  const byPerson = new Map();
+
+  for (const relElem of allRelationships) {
+    const superElems = relElem.superElements || [];
+    const relType = relElem.relType;
+    if (superElems.length !== 2 || !relType) continue;
+
+    // A person listed on both sides only takes the first
+    const seen = new Set();
+    superElems.forEach((superElem, idx) => {
+      const personId = superElem.id;
+      if (seen.has(personId)) return;
+      seen.add(personId);
+
+      const other = superElems[1 - idx];
+      const relatedPerson = personMap.get(other.id);
+      if (!relatedPerson) return;
+
+      if (!byPerson.has(personId)) byPerson.set(personId, []);
+      byPerson.get(personId).push({
+        type: relType,
+        role: getRole(relType, superElem.order),
+        relatedPersonId: other.id,
+        relatedPersonName: fullName(relatedPerson) || 'Unknown'
+      });
+    });
+  }
+
+  return byPerson;
 };
 
-// Get all RECORD elements (households)
-const records = censusData.elements.filter(el => el.elementType === 'RECORD');
-
-// Create simplified structure
-const simplifiedData = {
-  records: records.map(record => {
-    // Get all PERSON elements for this record
-    const personIds = record.subElements?.map(se => se.id) || [];
-    const personElements = censusData.elements.filter(el =>
-      el.elementType === 'PERSON' && personIds.includes(el.id)
-    );
-
-    const people = personElements.map(getPerson);
-
-    return {
-      id: record.id,
-      people
-    };
-  }).filter(record => record.people.length > 0)
+/**
+ * Build top-level relationship graph for the record
+ */
+const buildRelationshipGraph = (allRelationships, personMap) => {
+  const graph = [];
+
+  for (const relElem of allRelationships) {
+    const superElems = relElem.superElements || [];
+    const relType = relElem.relType;
+    if (superElems.length !== 2 || !relType) continue;
+
+    const [first, second] = superElems;
+    const person1 = personMap.get(first.id);
+    const person2 = personMap.get(second.id);
+    if (!person1 || !person2) continue;
+
+    graph.push({
+      id: relElem.id,
+      type: relType,
+      person1: { id: first.id, name: fullName(person1) || 'Unknown', role: getRole(relType, first.order) },
+      person2: { id: second.id, name: fullName(person2) || 'Unknown', role: getRole(relType, second.order) }
+    });
+  }
+
+  return graph;
 };
 
-// Write simplified JSON
-fs.writeFileSync('./1950Census-simple.json', JSON.stringify(simplifiedData, null, 2));
+const uniquePlaces = (places) => [...new Set(places.filter(p => !IGNORED_PLACES.has(p)))];
+
+/**
+ * Build simplified record object from RECORD element
+ */
+export const buildRecord = (recordElem, elementMap) => {
+  const personIds = (recordElem.subElements || []).map(sub => sub.id);
+
+  // Walk each subelement's subtree once and reuse it for people, relationships and fields
+  const people = [];
+  const allRelationships = new Set();
+  const dates = [];
+  const places = [];
+  let eventType = 'Census';
+
+  for (const pid of personIds) {
+    const personElem = elementMap.get(pid);
+    if (!personElem) continue;
+
+    const descendants = collectDescendants(pid, elementMap, []);
+    if (personElem.elementType === 'PERSON') {
+      people.push(buildPerson(personElem, descendants));
+    }
+
+    for (const desc of descendants) {
+      if (desc.elementType === 'RELATIONSHIP') {
+        allRelationships.add(desc);
+      } else if (desc.elementType === 'FIELD') {
+        const text = getFieldText(desc);
+        if (!text) continue;
+
+        if (desc.fieldType === 'DATE' && text !== '--' && text !== 'none') dates.push(text);
+        else if (desc.fieldType === 'PLACE') places.push(text);
+        else if (desc.fieldType === 'EVENT_TYPE' && text !== 'Other') eventType = text;
+      }
+    }
+  }
+
+  const personMap = new Map(people.map(p => [p.id, p]));
+  const relationships = [...allRelationships];
+
+  const byPerson = extractPeopleRelationships(relationships, personMap);
+  for (const person of people) {
+    person.relationships = byPerson.get(person.id) || [];
+  }
+
+  // Determine primary person (person with no CHILD role, preferring Ockerman surname and older age)
+  const candidates = people
+    .filter(person => !person.relationships.some(rel => rel.role === 'CHILD'))
+    .map(person => ({
+      person,
+      hasOckerman: person.surname.toLowerCase().includes('ockerman') ? 1 : 0,
+      age: /^\d+$/.test(person.age) ? parseInt(person.age, 10) : 0
+    }));
+
+  if (candidates.length > 0) {
+    candidates.sort((a, b) => (b.hasOckerman - a.hasOckerman) || (b.age - a.age));
+    candidates[0].person.isPrimary = true;
+  }
+
+  // Use the most complete (first longest) date
+  const date = dates.reduce((best, d) => (d.length > best.length ? d : best), '');
+
+  return {
+    id: recordElem.id,
+    recordType: eventType,
+    date,
+    place: uniquePlaces(places).join(', '),
+    people,
+    relationshipGraph: buildRelationshipGraph(relationships, personMap)
+  };
+};
+
+/**
+ * Extract document-level date and place from all FIELD elements
+ */
+export const extractDocumentMetadata = (elements) => {
+  const dates = [];
+  const places = [];
+
+  for (const elem of elements) {
+    if (elem.elementType !== 'FIELD') continue;
+    const text = getFieldText(elem);
+    if (!text) continue;
+
+    if (elem.fieldType === 'DATE' && text !== '--' && text !== 'none') dates.push(text);
+    else if (elem.fieldType === 'PLACE') places.push(text);
+  }
+
+  // Max 3 place components
+  return { date: dates[0] || '', place: uniquePlaces(places).slice(0, 3).join(', ') };
+};
+
+/**
+ * Transform the elements of one image partition
+ */
+export const transformToSimplified = (elements, log = () => {}) => {
+  log(`Processing ${elements.length} elements...`);
+
+  const elementMap = buildElementMap(elements);
+
+  const doc = extractDocumentMetadata(elements);
+  log(`Document date: ${doc.date || 'Not found'}`);
+  log(`Document place: ${doc.place || 'Not found'}`);
+
+  const records = [];
+  for (const elem of elements) {
+    if (elem.elementType !== 'RECORD') continue;
+
+    const record = buildRecord(elem, elementMap);
+    // Use document-level date/place if record doesn't have them
+    if (!record.date) record.date = doc.date;
+    if (!record.place) record.place = doc.place;
+    if (record.people.length > 0) records.push(record);
+  }
+
+  return { records };
+};
+
+/**
+ * JSON.stringify matching Python's json.dump(indent=2) output
+ * (ensure_ascii escapes everything from DEL (0x7f) up)
+ */
+const toPythonJson = (value, indent = '') =>
+  JSON.stringify(value, null, 2)
+    .replace(/[\u007f-\uffff]/g, c => `\\u${c.charCodeAt(0).toString(16).padStart(4, '0')}`)
+    .replace(/\n/g, `\n${indent}`);
+
+/**
+ * Streams `{"records": [...]}` one record at a time
+ */
+const createRecordWriter = (stream) => {
+  let count = 0;
+
+  const write = (text) => (stream.write(text) ? Promise.resolve() : new Promise(resolve => stream.once('drain', resolve)));
+
+  return {
+    get count() {
+      return count;
+    },
+    write(record) {
+      const prefix = count === 0 ? '{\n  "records": [\n    ' : ',\n    ';
+      count++;
+      return write(prefix + toPythonJson(record, '    '));
+    },
+    end() {
+      const tail = count === 0 ? '{\n  "records": []\n}' : '\n  ]\n}';
+      return new Promise((resolve, reject) => {
+        stream.on('error', reject);
+        stream.end(tail, resolve);
+      });
+    }
+  };
+};
+
+const USAGE = 'Usage: node simplify-census.js INPUT.json [INPUT.json ...] -o OUTPUT.json';
+
+const usageError = (message) => {
+  console.error(`${USAGE}\n${message}`);
+  process.exit(2);
+};
+
+/**
+ * Only INPUT... and -o/--output are supported; Python-only options such as
+ * --workers or --metrics-textfile are rejected instead of read as input paths
+ */
+const parseArgs = (argv) => {
+  const inputs = [];
+  let output = null;
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === '-o' || arg === '--output') {
+      if (i + 1 >= argv.length) usageError(`${arg} needs an OUTPUT path`);
+      output = argv[++i];
+    } else if (arg.startsWith('--output=')) {
+      output = arg.slice('--output='.length);
+    } else if (arg.startsWith('-')) {
+      usageError(`Unknown option ${arg} (simplify-census-data.py options such as --workers are not supported here)`);
+    } else {
+      inputs.push(arg);
+    }
+  }
+  if (inputs.length === 0 || !output) {
+    usageError('An input and -o OUTPUT are required');
+  }
+  return { inputs, output };
+};
+
+const main = async () => {
+  const { inputs, output } = parseArgs(process.argv.slice(2));
+  const log = console.log;
+
+  async function* allDocuments() {
+    for (const input of inputs) {
+      log(`Loading ${input}...`);
+      yield* readJsonDocuments(input);
+    }
+  }
+
+  // Records are streamed to a temporary file and moved into place on success
+  log(`Transforming data and writing to ${output}...`);
+  const tmpOutput = `${output}.${process.pid}.tmp`;
+  const writer = createRecordWriter(fs.createWriteStream(tmpOutput));
+  let partitionCount = 0;
+  let totalPeople = 0;
+
+  try {
+    for await (const [key, elements] of iterPartitions(allDocuments(), log)) {
+      log(`Partition ${key || '(no partitionKey)'}:`);
+      const { records } = transformToSimplified(elements, log);
+      partitionCount++;
+
+      for (const record of records) {
+        totalPeople += record.people.length;
+        await writer.write(record);
+      }
+    }
+
+    await writer.end();
+    fs.renameSync(tmpOutput, output);
+  } finally {
+    fs.rmSync(tmpOutput, { force: true });
+  }
+
+  log(`Processed ${partitionCount} image partition(s)`);
+  log(`Found ${writer.count} records with people`);
+  log(`Total people: ${totalPeople}`);
+  log(`Simplified census data written to ${output}`);
+};
 
-console.log('Simplified census data written to 1950Census-simple.json');
-console.log(`Found ${simplifiedData.records.length} household records`);
-console.log(`Total people: ${simplifiedData.records.reduce((sum, r) => sum + r.people.length, 0)}`);
+main().catch(error => {
+  console.error(`Error: ${error.message}`);
+  console.error(error.stack);
+  process.exitCode = 1;
+});
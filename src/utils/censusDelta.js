@@ -0,0 +1,125 @@
+/**
+ * Apply id-keyed deltas produced by census_delta.py to simplified census data
+ * Lets the UI and downstream syncs receive a patch instead of a whole document
+ *
+ * Patches are verified against their baseHash / targetHash (SHA-1 of the same
+ * canonical JSON census_delta.py hashes), so a patch applied to the wrong base
+ * is rejected instead of silently producing wrong data
+ */
+
+const RECORD_COLLECTIONS = ['people', 'relationshipGraph'];
+
+/**
+ * JSON with sorted keys and no whitespace, matching census_delta.canonical_json
+ * Keys are written in sorted order explicitly, since JS objects put integer-like
+ * keys first. Only strings, bools, null and integers (up to 2^53) hash the same
+ * as in Python; census_delta.py rejects non-integral floats
+ */
+const canonicalJson = (value) => {
+  if (Array.isArray(value)) {
+    return `[${value.map(item => canonicalJson(item) ?? 'null').join(',')}]`;
+  }
+  if (value && typeof value === 'object') {
+    const entries = Object.keys(value)
+      .filter(key => value[key] !== undefined)
+      .sort()
+      .map(key => `${JSON.stringify(key)}:${canonicalJson(value[key])}`);
+    return `{${entries.join(',')}}`;
+  }
+  return JSON.stringify(value);
+};
+
+/**
+ * Content hash of simplified census data, matching census_delta.content_hash
+ */
+export const censusContentHash = async (value) => {
+  const digest = await globalThis.crypto.subtle.digest('SHA-1', new TextEncoder().encode(canonicalJson(value)));
+  return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+};
+
+/**
+ * Apply field-level changes to a copy of an entity
+ */
+const applyFields = (entity, change) => {
+  const updated = { ...entity };
+  (change.removedFields || []).forEach(key => {
+    delete updated[key];
+  });
+  return { ...updated, ...(change.fields || {}) };
+};
+
+/**
+ * Apply a collection patch ({ added, removed, changed, order }) to a list of entities
+ */
+const applyCollection = (entities, collectionPatch, applyEntity) => {
+  if (!collectionPatch) return entities;
+
+  const removed = new Set(collectionPatch.removed || []);
+  const changed = collectionPatch.changed || {};
+
+  const result = new Map();
+  entities.forEach(entity => {
+    if (removed.has(entity.id)) return;
+    const change = changed[entity.id];
+    result.set(entity.id, change ? applyEntity(entity, change) : entity);
+  });
+
+  const missing = Object.keys(changed).filter(id => !result.has(id));
+  if (missing.length > 0) {
+    throw new Error(`Census delta changes unknown ids: ${missing.slice(0, 5).join(', ')}`);
+  }
+
+  (collectionPatch.added || []).forEach(entity => {
+    result.set(entity.id, entity);
+  });
+
+  if (!collectionPatch.order) return Array.from(result.values());
+  if (collectionPatch.order.length !== result.size || !collectionPatch.order.every(id => result.has(id))) {
+    throw new Error('Census delta order does not match the resulting ids');
+  }
+  return collectionPatch.order.map(id => result.get(id));
+};
+
+/**
+ * Apply a record change, including nested people / relationshipGraph patches
+ */
+const applyRecord = (record, change) => {
+  const updated = applyFields(record, change);
+  RECORD_COLLECTIONS.forEach(collection => {
+    if (change[collection]) {
+      updated[collection] = applyCollection(record[collection] || [], change[collection], applyFields);
+    }
+  });
+  return updated;
+};
+
+/**
+ * Apply a census delta to simplified census data
+ * Unchanged records and people keep their object identity, so memoized
+ * components only re-render for the entities the delta touched
+ *
+ * `baseHash` may be passed when the caller already knows the hash of the data
+ * it holds; otherwise it is computed. Throws if the patch was made against a
+ * different base or does not reproduce its target.
+ */
+export const applyCensusDelta = async (censusData, delta, { baseHash } = {}) => {
+  if (delta.version !== 1) {
+    throw new Error(`Unsupported census delta version: ${delta.version}`);
+  }
+
+  const currentHash = baseHash ?? await censusContentHash(censusData);
+  if (currentHash !== delta.baseHash) {
+    throw new Error('Census delta was made against different data (baseHash mismatch)');
+  }
+
+  const result = applyFields(censusData, delta);
+  if ('records' in censusData || delta.records) {
+    result.records = applyCollection(censusData.records || [], delta.records, applyRecord);
+  }
+
+  if (await censusContentHash(result) !== delta.targetHash) {
+    throw new Error('Census delta did not reproduce its target (targetHash mismatch)');
+  }
+
+  return result;
+};
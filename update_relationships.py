@@ -3,6 +3,7 @@
 Update relationships in KentuckyCensus-simple.json based on manual verification.
 """
 
+import argparse
 import json
 
 # Person ID mapping
@@ -224,11 +225,23 @@ def get_person_name(person_id, people_data):
                 return f"{given} {surname}".strip() or "Unknown"
     return "Unknown"
 
-def main():
-    # Load current data
-    with open('KentuckyCensus-simple.json', 'r') as f:
-        data = json.load(f)
+def load_relationship_spec(filepath):
+    """
+    Load person IDs and relationship definitions from a JSON file.
 
+    The file holds {"people": {key: id}, "relationships": {key: [[type, role, related_key], ...]}},
+    the same shape as the PEOPLE and RELATIONSHIPS tables above.
+    """
+    with open(filepath, 'r') as f:
+        spec = json.load(f)
+    relationships = {
+        key: [tuple(rel) for rel in rel_list]
+        for key, rel_list in spec['relationships'].items()
+    }
+    return spec['people'], relationships
+
+def apply_relationships(data, people=PEOPLE, definitions=RELATIONSHIPS):
+    """Replace each listed person's relationships in `data` (in place)"""
     # Build ID to person map
     id_to_person = {}
     for record in data['records']:
@@ -236,8 +249,8 @@ def main():
             id_to_person[person['id']] = person
 
     # Update relationships for each person
-    for person_key, rel_list in RELATIONSHIPS.items():
-        person_id = PEOPLE.get(person_key)
+    for person_key, rel_list in definitions.items():
+        person_id = people.get(person_key)
         if not person_id:
             print(f"Warning: No ID found for {person_key}")
             continue
@@ -250,7 +263,7 @@ def main():
         # Build relationships array
         relationships = []
         for rel_type, role, related_key in rel_list:
-            related_id = PEOPLE.get(related_key)
+            related_id = people.get(related_key)
             if not related_id:
                 print(f"Warning: No ID found for related person {related_key}")
                 continue
@@ -268,8 +281,23 @@ def main():
         person_obj['relationships'] = relationships
         print(f"Updated {person_key}: {len(relationships)} relationships")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update relationships in a simplified census file")
+    parser.add_argument('data_file', nargs='?', default='KentuckyCensus-simple.json')
+    parser.add_argument('--spec', help='JSON file with people/relationships to use instead of the built-in tables')
+    args = parser.parse_args(argv)
+
+    # Load current data
+    with open(args.data_file, 'r') as f:
+        data = json.load(f)
+
+    if args.spec:
+        apply_relationships(data, *load_relationship_spec(args.spec))
+    else:
+        apply_relationships(data)
+
     # Save updated data
-    with open('KentuckyCensus-simple.json', 'w') as f:
+    with open(args.data_file, 'w') as f:
         json.dump(data, f, indent=2)
 
     print("\n✓ Relationships updated successfully!")